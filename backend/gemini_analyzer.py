@@ -3,24 +3,87 @@ Gemini-powered poker table analyzer
 Uses Google's Gemini Flash 2.5 for comprehensive poker analysis
 """
 
+import asyncio
+import hashlib
 import os
-import base64
 import json
 import logging
-from typing import Dict, Any
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from google.api_core import retry_async as google_retry_async
+import numpy as np
 from PIL import Image
 from io import BytesIO
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:  # orjson is optional - fall back to the stdlib parser
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # redis is optional - only needed for the shared response cache
+    redis_asyncio = None
+
 logger = logging.getLogger(__name__)
 
-# Configure Gemini (will be checked on first use)
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-    logger.info("✅ Gemini API key configured")
-else:
-    logger.warning("⚠️ GEMINI_API_KEY not set - add it to environment variables on Render")
+# Screenshots above these limits are downscaled and re-encoded as JPEG before upload
+MAX_IMAGE_BYTES = 800_000
+MAX_IMAGE_EDGE = 1024
+JPEG_QUALITY = 85
+
+# Image formats that can be passed to Gemini as-is
+GEMINI_IMAGE_TYPES = ("image/png", "image/jpeg", "image/webp")
+
+# Gemini returns bare JSON (no prose or code fences) capped at this many tokens.
+# A typical analysis is 400-700 tokens; the free-text fields (range_analysis,
+# ev_calculation, alternative_lines) can run long, and a reply cut off at the
+# cap is unparseable, so leave plenty of headroom
+MAX_OUTPUT_TOKENS = 2048
+_FINISH_MAX_TOKENS = genai.protos.Candidate.FinishReason.MAX_TOKENS
+
+# Max concurrent Gemini calls per worker - extra requests queue instead of tripping 429s
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "8"))
+
+# Rate-limit (429) and overload (503) errors are retried with jittered exponential
+# backoff (0.25s doubling up to 4s) for at most GEMINI_RETRY_DEADLINE seconds
+GEMINI_RETRY_DEADLINE = 15.0
+_RETRYABLE_ERRORS = (google_exceptions.ResourceExhausted, google_exceptions.ServiceUnavailable)
+_ASYNC_RETRY = google_retry_async.AsyncRetry(
+    predicate=google_retry_async.if_exception_type(*_RETRYABLE_ERRORS),
+    initial=0.25,
+    maximum=4.0,
+    multiplier=2.0,
+    timeout=GEMINI_RETRY_DEADLINE
+)
+
+# Identical screenshots within this window reuse the previous analysis
+RESPONSE_CACHE_TTL = 30.0
+RESPONSE_CACHE_SIZE = 256
+
+# Optional Redis cache shared by all workers (enabled when REDIS_URL is set).
+# Entries live as long as local ones; a Redis call slower than REDIS_TIMEOUT
+# seconds counts as a miss so an unresponsive server never stalls /analyze
+REDIS_URL = os.getenv("REDIS_URL")
+SHARED_CACHE_TTL = int(RESPONSE_CACHE_TTL)
+REDIS_TIMEOUT = 0.3
+
+# Uploads are screened on a THUMBNAIL_SIZE² grayscale thumbnail before calling
+# Gemini: near-uniform frames (lens cap, black OBS frame) and frames with almost
+# no edges (badly out of focus) are rejected without spending an API call
+THUMBNAIL_SIZE = 128
+MIN_IMAGE_CONTRAST = 5.0
+MIN_IMAGE_SHARPNESS = 10.0
+
+# Matches a response wrapped in a markdown code fence (```json ... ```)
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL | re.IGNORECASE)
 
 # Poker analysis prompt
 POKER_ANALYSIS_PROMPT = """You are an expert poker GTO (Game Theory Optimal) advisor analyzing a poker table screenshot from GGPoker.
@@ -109,18 +172,144 @@ REMEMBER: The "D" button marker is THE KEY to determining position correctly!
 Return ONLY valid JSON, no markdown, no extra text."""
 
 
+# Per-request position notes, built once as Gemini Parts for the 6-max positions
+POSITIONS = ("BTN", "SB", "BB", "UTG", "MP", "CO")
+_POSITION_PARTS = {
+    position: genai.protos.Part(
+        text=f"IMPORTANT: Hero is seated at {position} position. Analyze this table."
+    )
+    for position in POSITIONS
+}
+
+
+def _sniff_mime_type(image_data: bytes) -> Optional[str]:
+    """Identify the image format from its magic number (no decoding)"""
+    if image_data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if image_data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if image_data[:4] == b"RIFF" and image_data[8:12] == b"WEBP":
+        return "image/webp"
+    if image_data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return None
+
+
+def _thumbnail(image_data: bytes) -> Image.Image:
+    """Small grayscale copy of an image, decoded as cheaply as possible"""
+    image = Image.open(BytesIO(image_data))
+    image.draft("L", (THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+    return image.convert("L").resize((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.BILINEAR)
+
+
+def _quality_problem(thumbnail: Image.Image) -> Optional[str]:
+    """Describe why an image is unusable for analysis, or None if it looks fine"""
+    pixels = np.asarray(thumbnail, dtype=np.float32)
+    if pixels.std() < MIN_IMAGE_CONTRAST:
+        return "Image looks blank"
+    
+    # Variance of the 4-neighbour Laplacian - low when there are no sharp edges
+    laplacian = (
+        pixels[:-2, 1:-1] + pixels[2:, 1:-1] + pixels[1:-1, :-2] + pixels[1:-1, 2:]
+        - 4 * pixels[1:-1, 1:-1]
+    )
+    if laplacian.var() < MIN_IMAGE_SHARPNESS:
+        return "Image is too blurry"
+    
+    return None
+
+
+def _prepare_image(image_data: bytes) -> Dict[str, Any]:
+    """
+    Build the Gemini image part, shrinking oversized screenshots
+    
+    Small PNG, JPEG and WebP images are sent untouched. Large ones are
+    downscaled so the long edge is at most MAX_IMAGE_EDGE and re-encoded as
+    JPEG to cut upload time and image tokens - the poker UI stays perfectly
+    readable at that size. Other formats (GIF, BMP, TIFF...) aren't accepted
+    by Gemini as inline images, so they are always re-encoded.
+    """
+    # The format comes from the bytes themselves - the upload's content type
+    # is whatever the client claims
+    mime_type = _sniff_mime_type(image_data)
+    
+    # Image.open only parses the header here - pixels are decoded lazily
+    image = Image.open(BytesIO(image_data))
+    width, height = image.size
+    if (mime_type in GEMINI_IMAGE_TYPES
+            and max(width, height) <= MAX_IMAGE_EDGE
+            and len(image_data) <= MAX_IMAGE_BYTES):
+        return {"mime_type": mime_type, "data": image_data}
+    
+    scale = min(1.0, MAX_IMAGE_EDGE / max(width, height))
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    
+    # Let the JPEG decoder do most of the downscaling for free
+    image.draft("RGB", size)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    if image.size != size:
+        image = image.resize(size, Image.LANCZOS, reducing_gap=3.0)
+    
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    resized_data = buffer.getvalue()
+    
+    logger.info(
+        f"🗜️  Resized image {width}x{height} -> {size[0]}x{size[1]} "
+        f"({len(image_data) // 1024} KB -> {len(resized_data) // 1024} KB)"
+    )
+    return {"mime_type": "image/jpeg", "data": resized_data}
+
+
 class GeminiPokerAnalyzer:
     """Poker table analyzer using Gemini vision"""
     
     def __init__(self):
-        """Initialize Gemini model"""
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        """Configure Gemini and initialize the model"""
+        # Configured here rather than at import so each worker sets up its own client
+        self.api_key = os.getenv("GEMINI_API_KEY")
+        if self.api_key:
+            genai.configure(api_key=self.api_key)
+            logger.info("✅ Gemini API key configured")
+        else:
+            logger.warning("⚠️ GEMINI_API_KEY not set - add it to environment variables on Render")
+        
+        # The static prompt lives in the system instruction so every request
+        # shares an identical prefix that Gemini can cache between calls
+        self.model = genai.GenerativeModel(
+            'gemini-2.0-flash-exp',
+            system_instruction=POKER_ANALYSIS_PROMPT,
+            generation_config=genai.GenerationConfig(
+                response_mime_type="application/json",
+                max_output_tokens=MAX_OUTPUT_TOKENS
+            )
+        )
+        self._semaphore = asyncio.Semaphore(GEMINI_CONCURRENCY)
+        
+        # (image hash, hero position) -> (timestamp, result), oldest first
+        self._response_cache: OrderedDict = OrderedDict()
+        
+        self._redis = None
+        if REDIS_URL:
+            if redis_asyncio is None:
+                logger.warning("⚠️ REDIS_URL is set but the redis package is not installed")
+            else:
+                self._redis = redis_asyncio.from_url(
+                    REDIS_URL,
+                    socket_connect_timeout=REDIS_TIMEOUT,
+                    socket_timeout=REDIS_TIMEOUT
+                )
+                logger.info("✅ Shared Redis response cache enabled")
         logger.info("✅ Gemini analyzer initialized")
     
-    def analyze_poker_table(self, image_data: bytes, hero_position: str = "BTN") -> Dict[str, Any]:
+    async def analyze_poker_table_async(self, image_data: bytes, hero_position: str = "BTN") -> Dict[str, Any]:
         """
         Analyze poker table image using Gemini
         
+        Awaits Gemini on the event loop instead of blocking a worker thread
+        for the whole round-trip.
+        
         Args:
             image_data: Raw image bytes
             hero_position: Hero's position (BTN, SB, BB, UTG, MP, CO)
@@ -129,43 +318,177 @@ class GeminiPokerAnalyzer:
             Dictionary with analysis results
         """
         # Check if API key is configured
-        if not GEMINI_API_KEY:
-            logger.error("❌ GEMINI_API_KEY not configured!")
-            return {
-                "success": False,
-                "error": "GEMINI_API_KEY not configured. Please add it to Render environment variables."
-            }
+        if not self.api_key:
+            return self._missing_api_key()
         
         try:
-            logger.info(f"🤖 Sending image to Gemini for analysis... Hero position: {hero_position}")
-            
-            # Convert bytes to PIL Image
-            image = Image.open(BytesIO(image_data))
+            # Hashing and image decode/resize are CPU work - keep them off the event loop
+            cache_key, quality_problem = await asyncio.to_thread(self._inspect_image, image_data, hero_position)
+            if quality_problem:
+                return self._rejected_image(quality_problem)
             
-            # Create position-specific prompt
-            position_prompt = f"{POKER_ANALYSIS_PROMPT}\n\nIMPORTANT: Hero is seated at {hero_position} position."
+            cached = self._get_cached(cache_key)
+            if cached is None:
+                cached = await self._get_shared(cache_key)
+            if cached is not None:
+                return cached
             
-            # Generate analysis
-            response = self.model.generate_content([
-                position_prompt,
-                image
-            ])
+            contents = await asyncio.to_thread(self._build_contents, image_data, hero_position)
+            async with self._semaphore:
+                response = await self.model.generate_content_async(
+                    contents,
+                    request_options={"retry": _ASYNC_RETRY}
+                )
+            result = self._parse_response(response)
+            self._store_cached(cache_key, result)
+            await self._store_shared(cache_key, result)
+            return result
             
-            # Parse JSON response
-            analysis_text = response.text.strip()
-            
-            # Remove markdown code blocks if present
-            if analysis_text.startswith("```json"):
-                analysis_text = analysis_text[7:]
-            if analysis_text.startswith("```"):
-                analysis_text = analysis_text[3:]
-            if analysis_text.endswith("```"):
-                analysis_text = analysis_text[:-3]
-            
-            analysis_text = analysis_text.strip()
+        except Exception as e:
+            logger.error(f"❌ Gemini analysis error: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    async def warmup(self) -> None:
+        """
+        Open the Gemini connection before the first real request
+        
+        count_tokens is free and needs no image, but still performs the DNS,
+        TLS and HTTP/2 setup that would otherwise land on the first analysis.
+        """
+        if not self.api_key:
+            return
+        
+        try:
+            await self.model.count_tokens_async("ping", request_options={"timeout": 10})
+            logger.info("🔥 Gemini connection warmed up")
+        except Exception as e:
+            logger.warning(f"⚠️ Gemini warmup failed: {e}")
+    
+    async def close(self) -> None:
+        """Release network resources held by the analyzer"""
+        if self._redis is not None:
+            await self._redis.aclose()
+    
+    def _missing_api_key(self) -> Dict[str, Any]:
+        """Error result returned when no Gemini API key is configured"""
+        logger.error("❌ GEMINI_API_KEY not configured!")
+        return {
+            "success": False,
+            "error": "GEMINI_API_KEY not configured. Please add it to Render environment variables."
+        }
+    
+    def _inspect_image(self, image_data: bytes, hero_position: str) -> Tuple[Tuple[str, str], Optional[str]]:
+        """
+        Screen a screenshot before it reaches Gemini
+        
+        Returns the cache key (hash of the raw bytes plus hero position) and a
+        description of any quality problem. The key is exact on purpose: pot,
+        bet and stack amounts are small text that a perceptual hash can't see,
+        so visually similar screenshots may need different advice.
+        """
+        image_hash = hashlib.blake2b(image_data, digest_size=16).hexdigest()
+        return (image_hash, hero_position), _quality_problem(_thumbnail(image_data))
+    
+    def _rejected_image(self, problem: str) -> Dict[str, Any]:
+        """Error result for an upload that failed the quality screen"""
+        logger.warning(f"⚠️ Skipping Gemini call: {problem}")
+        return {
+            "success": False,
+            "error": f"Image quality too low: {problem.lower()}",
+            "message": f"{problem}. Retake the photo with the whole table clearly in focus."
+        }
+    
+    def _get_cached(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        """Return a fresh cached result for this screenshot, if any"""
+        now = time.monotonic()
+        
+        # Entries are oldest first - drop the expired ones before searching
+        while self._response_cache:
+            oldest_key, (stored_at, _) = next(iter(self._response_cache.items()))
+            if now - stored_at <= RESPONSE_CACHE_TTL:
+                break
+            del self._response_cache[oldest_key]
+        
+        entry = self._response_cache.get(key)
+        if entry is None:
+            return None
+        
+        logger.info("♻️  Unchanged table screenshot - reusing cached Gemini analysis")
+        return entry[1]
+    
+    def _store_cached(self, key: Tuple[str, str], result: Dict[str, Any]) -> None:
+        """Remember a successful result, evicting the oldest entries"""
+        if not result.get("success"):
+            return
+        
+        self._response_cache[key] = (time.monotonic(), result)
+        self._response_cache.move_to_end(key)
+        while len(self._response_cache) > RESPONSE_CACHE_SIZE:
+            self._response_cache.popitem(last=False)
+    
+    def _shared_key(self, key: Tuple[str, str]) -> str:
+        """Redis key for a cache key"""
+        image_hash, hero_position = key
+        return f"gemini:{hero_position}:{image_hash}"
+    
+    async def _get_shared(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        """Look a screenshot up in the shared Redis cache, if configured"""
+        if self._redis is None:
+            return None
+        
+        try:
+            payload = await self._redis.get(self._shared_key(key))
+            if payload is None:
+                return None
+            result = _json_loads(payload)
+        except Exception as e:
+            logger.warning(f"⚠️ Redis cache lookup failed: {e}")
+            return None
+        
+        self._store_cached(key, result)
+        logger.info("♻️  Unchanged table screenshot - reusing shared cached Gemini analysis")
+        return result
+    
+    async def _store_shared(self, key: Tuple[str, str], result: Dict[str, Any]) -> None:
+        """Publish a successful result to the shared Redis cache, if configured"""
+        if self._redis is None or not result.get("success"):
+            return
+        
+        try:
+            await self._redis.set(self._shared_key(key), _json_dumps(result), ex=SHARED_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"⚠️ Redis cache store failed: {e}")
+    
+    def _build_contents(self, image_data: bytes, hero_position: str) -> List[Any]:
+        """Build the per-request Gemini contents (position note + image)"""
+        logger.info(f"🤖 Sending image to Gemini for analysis... Hero position: {hero_position}")
+        
+        # Pass raw bytes straight through, re-encoding only oversized or unsupported images
+        image = _prepare_image(image_data)
+        
+        # Only the position-specific part varies per request
+        position_prompt = _POSITION_PARTS.get(hero_position)
+        if position_prompt is None:
+            position_prompt = f"IMPORTANT: Hero is seated at {hero_position} position. Analyze this table."
+        
+        return [position_prompt, image]
+    
+    def _parse_response(self, response) -> Dict[str, Any]:
+        """Parse the JSON analysis out of a Gemini response"""
+        if response.candidates and response.candidates[0].finish_reason == _FINISH_MAX_TOKENS:
+            logger.warning(f"⚠️ Gemini response hit the {MAX_OUTPUT_TOKENS} token cap and is truncated")
+        
+        try:
+            # Parse JSON response, removing markdown code blocks if present
+            analysis_text = response.text
+            match = _FENCE_RE.match(analysis_text)
+            analysis_text = (match.group(1) if match else analysis_text).strip()
             
             # Parse JSON
-            analysis = json.loads(analysis_text)
+            analysis = _json_loads(analysis_text)
             
             logger.info(f"✅ Gemini analysis complete: {analysis['recommendation']['action']}")
             
@@ -182,13 +505,6 @@ class GeminiPokerAnalyzer:
                 "error": "Failed to parse analysis response",
                 "raw_response": response.text[:500]
             }
-            
-        except Exception as e:
-            logger.error(f"❌ Gemini analysis error: {e}")
-            return {
-                "success": False,
-                "error": str(e)
-            }
     
     def format_for_frontend(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -3,26 +3,50 @@ Main FastAPI server for Poker GTO Vision
 Powered by Gemini Flash 2.5 for AI-driven poker analysis
 """
 
-from fastapi import FastAPI, File, UploadFile, Form
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, File, UploadFile, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 import uvicorn
 import logging
+import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
 from gemini_analyzer import GeminiPokerAnalyzer
+from schemas import AnalyzeResponse
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Poker GTO Vision Backend - Gemini Powered")
+try:
+    import orjson  # noqa: F401 - only needed by ORJSONResponse
+    default_response_class = ORJSONResponse
+except ImportError:
+    default_response_class = JSONResponse
 
-# CORS middleware for frontend communication
-import os
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the Gemini analyzer once per worker and warm its connection"""
+    analyzer = GeminiPokerAnalyzer()
+    await analyzer.warmup()
+    app.state.analyzer = analyzer
+    yield
+    await analyzer.close()
+
+
+app = FastAPI(
+    title="Poker GTO Vision Backend - Gemini Powered",
+    default_response_class=default_response_class,
+    lifespan=lifespan
+)
+
+# CORS middleware for frontend communication
 # Allow frontend domain and localhost for development
 allowed_origins = [
     "https://lelabubu.ca",
@@ -45,8 +69,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Gemini analyzer
-analyzer = GeminiPokerAnalyzer()
+# Compress larger responses (detailed analysis text) for slow mobile links
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+# Uploads above this size are rejected before they are read or sent to Gemini
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+async def read_upload(upload: UploadFile) -> bytes:
+    """
+    Read an uploaded image in chunks, enforcing MAX_UPLOAD_BYTES
+    
+    Oversized files are refused from the size the multipart parser already
+    recorded, without reading them; the chunked read guards uploads whose
+    size is unknown.
+    """
+    if upload.size is not None and upload.size > MAX_UPLOAD_BYTES:
+        raise ValueError(f"Image too large ({upload.size // 1024} KB)")
+    
+    data = bytearray()
+    while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+        data += chunk
+        if len(data) > MAX_UPLOAD_BYTES:
+            raise ValueError(f"Image too large (over {MAX_UPLOAD_BYTES // 1024} KB)")
+    return bytes(data)
 
 
 @app.get("/")
@@ -59,8 +106,9 @@ async def root():
     }
 
 
-@app.post("/analyze")
+@app.post("/analyze", response_model=AnalyzeResponse, response_model_exclude_unset=True)
 async def analyze_image(
+    request: Request,
     image: UploadFile = File(...),
     position: str = Form("BTN")
 ):
@@ -68,22 +116,32 @@ async def analyze_image(
     Analyze poker table image using Gemini AI
     Returns: Main display data + detailed side panel info
     """
+    analyzer: GeminiPokerAnalyzer = request.app.state.analyzer
+    
     try:
         logger.info(f"📸 Received image: {image.filename}, position: {position}")
         
         # Read image data
-        image_data = await image.read()
+        try:
+            image_data = await read_upload(image)
+        except ValueError as e:
+            logger.warning(f"⚠️ Rejected upload: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "message": f"Image is too large. Please upload a screenshot under {MAX_UPLOAD_BYTES // (1024 * 1024)} MB."
+            }
         
         logger.info(f"🖼️  Sending to Gemini for analysis...")
         
-        # Analyze with Gemini
-        result = analyzer.analyze_poker_table(image_data, hero_position=position)
+        # Analyze with Gemini (awaited - doesn't block the event loop)
+        result = await analyzer.analyze_poker_table_async(image_data, hero_position=position)
         
         if not result.get("success"):
             return {
                 "success": False,
                 "error": result.get("error", "Analysis failed"),
-                "message": "Failed to analyze poker table. Please try again."
+                "message": result.get("message", "Failed to analyze poker table. Please try again.")
             }
         
         # Format for frontend
@@ -103,10 +161,18 @@ async def analyze_image(
 
 
 if __name__ == "__main__":
+    # Auto-reload is for local development only (ENV=dev). Otherwise run
+    # WEB_CONCURRENCY workers - a fixed default, since os.cpu_count() reports
+    # the host's CPUs inside containers. Deployments start uvicorn directly
+    # (see render.yaml) and pass the same variable to --workers
+    dev_mode = os.getenv("ENV") == "dev"
+    workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+    
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        reload=dev_mode,
+        workers=1 if dev_mode else workers,
         log_level="info"
     )
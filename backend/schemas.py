@@ -0,0 +1,50 @@
+"""
+Response models for the Poker GTO Vision API
+Mirror the dictionaries built by GeminiPokerAnalyzer.format_for_frontend
+"""
+
+from typing import Any, Optional
+from pydantic import BaseModel
+
+
+# Values copied straight from Gemini's JSON are typed Any - the model doesn't
+# guarantee their types (e.g. bet_size may come back as 3 or "3 BB"), and a
+# strict schema would turn an odd answer into a 500 instead of a result
+
+
+class Recommendation(BaseModel):
+    """Main display: action, odds and sizing"""
+    action: Any = None
+    pot_odds: Any = None
+    hand_equity: Any = None
+    pot_size: Optional[str] = None
+    bet_size: Any = None
+    position: Any = None
+
+
+class GameState(BaseModel):
+    """Street, pot and board as read from the table"""
+    street: Any = None
+    pot_dollars: Any = None
+    board_cards: Any = None
+
+
+class DetailedInfo(BaseModel):
+    """Side panel: reasoning and supporting analysis"""
+    game_state: Optional[GameState] = None
+    reasoning: Any = None
+    range_analysis: Any = None
+    ev_calculation: Any = None
+    action_history: Any = None
+    stack_sizes: Any = None
+    alternative_lines: Any = None
+
+
+class AnalyzeResponse(BaseModel):
+    """Result of /analyze - recommendation fields on success, error/message on failure"""
+    success: bool
+    hero_turn: Any = None
+    recommendation: Optional[Recommendation] = None
+    detailed_info: Optional[DetailedInfo] = None
+    error: Optional[str] = None
+    message: Optional[str] = None
@@ -0,0 +1,100 @@
+"""
+Regression tests for the Gemini analyzer's image handling and response cache
+Gemini itself is replaced by a stub model, so no API key or network is needed
+"""
+
+import asyncio
+import json
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+from gemini_analyzer import GeminiPokerAnalyzer, _prepare_image
+
+
+ANALYSIS = {
+    "game_info": {"pot_size_bb": 6, "street": "flop", "is_hero_turn": True},
+    "recommendation": {"action": "Call", "bet_size": "N/A", "reasoning": "Priced in"}
+}
+
+
+class StubResponse:
+    text = json.dumps(ANALYSIS)
+    candidates = []
+
+
+class StubModel:
+    """Stands in for genai.GenerativeModel and counts the calls it receives"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_content_async(self, contents, request_options=None):
+        self.calls += 1
+        return StubResponse()
+
+
+def table_screenshot(pot_text: str) -> bytes:
+    """Synthetic 1920x1080 table screenshot that differs only in its pot text"""
+    image = Image.new("RGB", (1920, 1080), (20, 90, 40))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((260, 140, 1660, 940), fill=(30, 120, 55), outline=(90, 60, 30), width=24)
+    for x in (760, 860, 960):
+        draw.rectangle((x, 440, x + 80, 560), fill=(245, 245, 245), outline=(0, 0, 0), width=3)
+    for x, y in ((860, 60), (1600, 300), (1600, 760), (860, 960), (120, 760), (120, 300)):
+        draw.rectangle((x, y, x + 200, y + 70), fill=(40, 40, 40), outline=(200, 200, 200), width=2)
+    draw.text((880, 380), f"Total Pot : {pot_text}", fill=(255, 255, 255))
+
+    buffer = BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def make_analyzer(monkeypatch) -> GeminiPokerAnalyzer:
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    analyzer = GeminiPokerAnalyzer()
+    analyzer.model = StubModel()
+    return analyzer
+
+
+def test_identical_screenshot_is_served_from_cache(monkeypatch):
+    analyzer = make_analyzer(monkeypatch)
+    screenshot = table_screenshot("$1.50")
+
+    first = asyncio.run(analyzer.analyze_poker_table_async(screenshot, "BTN"))
+    second = asyncio.run(analyzer.analyze_poker_table_async(screenshot, "BTN"))
+
+    assert first["success"] and second == first
+    assert analyzer.model.calls == 1
+
+
+def test_pot_text_change_is_not_served_from_cache(monkeypatch):
+    analyzer = make_analyzer(monkeypatch)
+
+    asyncio.run(analyzer.analyze_poker_table_async(table_screenshot("$1.50"), "BTN"))
+    result = asyncio.run(analyzer.analyze_poker_table_async(table_screenshot("$9.75"), "BTN"))
+
+    assert result["success"]
+    assert analyzer.model.calls == 2
+
+
+def small_screenshot(format: str) -> bytes:
+    """The synthetic table at half size, saved in the given format"""
+    image = Image.open(BytesIO(table_screenshot("$1.50"))).resize((960, 540))
+    buffer = BytesIO()
+    image.save(buffer, format)
+    return buffer.getvalue()
+
+
+def test_small_png_is_sent_untouched():
+    screenshot = small_screenshot("PNG")
+
+    assert _prepare_image(screenshot) == {"mime_type": "image/png", "data": screenshot}
+
+
+def test_unsupported_format_is_reencoded_as_jpeg():
+    for format in ("BMP", "GIF", "TIFF"):
+        part = _prepare_image(small_screenshot(format))
+
+        assert part["mime_type"] == "image/jpeg"
+        assert part["data"][:3] == b"\xff\xd8\xff"
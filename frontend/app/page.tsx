@@ -17,6 +17,10 @@ interface DetailedInfo {
   alternative_lines: string[]
 }
 
+// Captures are downscaled to this long edge before upload (matches the backend cap)
+const MAX_IMAGE_EDGE = 1024
+const JPEG_QUALITY = 0.85
+
 export default function Home() {
   const router = useRouter()
   const videoRef = useRef<HTMLVideoElement>(null)
@@ -111,15 +115,17 @@ export default function Home() {
       const canvas = canvasRef.current
       const video = videoRef.current
       
-      canvas.width = video.videoWidth
-      canvas.height = video.videoHeight
+      // Downscale large camera frames so the upload stays small
+      const scale = Math.min(1, MAX_IMAGE_EDGE / Math.max(video.videoWidth, video.videoHeight))
+      canvas.width = Math.round(video.videoWidth * scale)
+      canvas.height = Math.round(video.videoHeight * scale)
       
       const ctx = canvas.getContext('2d')
       if (!ctx) throw new Error('Could not get canvas context')
       
-      ctx.drawImage(video, 0, 0)
+      ctx.drawImage(video, 0, 0, canvas.width, canvas.height)
       
-      const imageDataUrl = canvas.toDataURL('image/jpeg', 0.9)
+      const imageDataUrl = canvas.toDataURL('image/jpeg', JPEG_QUALITY)
       setCapturedImage(imageDataUrl)
       
       // Stop camera during analysis
@@ -134,7 +140,7 @@ export default function Home() {
         canvas.toBlob(
           (blob) => blob ? resolve(blob) : reject(new Error('Failed to create blob')),
           'image/jpeg',
-          0.9
+          JPEG_QUALITY
         )
       })
 
@@ -28,7 +28,7 @@ echo.
 
 REM Start Backend in new window
 echo Starting Python backend...
-start "Poker GTO Backend" cmd /k "cd backend && if exist venv\Scripts\activate (venv\Scripts\activate) else (python -m venv venv && venv\Scripts\activate && pip install -r requirements.txt) && python main.py"
+start "Poker GTO Backend" cmd /k "cd backend && if exist venv\Scripts\activate (venv\Scripts\activate) else (python -m venv venv && venv\Scripts\activate && pip install -r requirements.txt) && set ENV=dev&& python main.py"
 
 timeout /t 3 /nobreak >nul
 
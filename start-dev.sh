@@ -37,7 +37,7 @@ start_backend() {
     fi
     
     echo "✅ Backend starting on http://0.0.0.0:8000"
-    python main.py
+    ENV=dev python main.py
 }
 
 # Function to start frontend